@@ -0,0 +1,29 @@
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+
+
+class OptionalBuildExt(build_ext):
+    # zoey._mask is only an accelerator; zoey.framing falls back to Python when it's missing
+
+    def run(self):
+        try:
+            super().run()
+        except Exception as e:
+            self.warn("Skipping C extensions: {}".format(e))
+
+    def build_extension(self, ext):
+        try:
+            super().build_extension(ext)
+        except Exception as e:
+            self.warn("Skipping {}: {}".format(ext.name, e))
+
+
+setup(
+    name="zoey",
+    version="0.1.0",
+    description="A python gevent websocket client",
+    packages=["zoey"],
+    install_requires=["gevent"],
+    ext_modules=[Extension("zoey._mask", ["zoey/_mask.c"])],
+    cmdclass={"build_ext": OptionalBuildExt},
+)
@@ -0,0 +1,85 @@
+import io
+
+from zoey import Client
+from zoey.framing import _BUFFERS, Frame, FrameOpcode
+
+
+class RecordingClient(Client):
+
+    def __init__(self, data: bytes):
+        super().__init__("ws://example.com/")
+        self.messages = []
+        self.closes = []
+        self.pings = []
+        self._rfile = io.BufferedReader(io.BytesIO(data))
+
+    def on_message(self, msg):
+        self.messages.append(msg.data)
+
+    def on_ping(self, ping):
+        self.pings.append(ping.raw_data)
+
+    def on_close(self, close):
+        self.closes.append(close)
+
+
+def frame(final: bool, opcode: FrameOpcode, payload: bytes, mask: bytes=None) -> bytes:
+    return bytes(Frame(final, 0, opcode, payload, mask).build())
+
+
+def assert_pool_has_no_duplicates():
+    for pool in _BUFFERS.pools.values():
+        assert len({id(buffer) for buffer in pool}) == len(pool)
+
+
+def test_continuation_frames_are_reassembled():
+    client = RecordingClient(
+        frame(False, FrameOpcode.BINARY, b"ab") +
+        frame(False, FrameOpcode.CONTINUATION, b"cd") +
+        frame(True, FrameOpcode.CONTINUATION, b"ef") +
+        frame(True, FrameOpcode.TEXT, b"next")
+    )
+    client.constructor.collect_frames()
+    assert client.messages == [b"abcdef", "next"]
+    assert client.closes == []
+    assert client.constructor.frame_setup == []
+
+
+def test_text_split_inside_a_character():
+    text = "héllo".encode("utf8")
+    client = RecordingClient(
+        frame(False, FrameOpcode.TEXT, text[:2]) +
+        frame(True, FrameOpcode.CONTINUATION, text[2:])
+    )
+    client.constructor.collect_frames()
+    assert client.messages == ["héllo"]
+
+
+def test_recycled_buffers_do_not_alias_delivered_data():
+    # Every payload lands in the same 1 KiB bucket, so later frames reuse earlier buffers
+    payloads = [bytes([i]) * 500 for i in range(6)]
+    client = RecordingClient(
+        frame(True, FrameOpcode.BINARY, payloads[0]) +
+        frame(True, FrameOpcode.PING, payloads[1][:100]) +
+        frame(True, FrameOpcode.BINARY, payloads[2], b"\x01\x02\x03\x04") +
+        frame(False, FrameOpcode.BINARY, payloads[3], b"\xff\x00\xff\x00") +
+        frame(True, FrameOpcode.CONTINUATION, payloads[4]) +
+        frame(True, FrameOpcode.PING, payloads[5][:100], b"\x10\x20\x30\x40") +
+        frame(True, FrameOpcode.TEXT, b"a" * 500, b"\x05\x06\x07\x08") +
+        frame(True, FrameOpcode.BINARY, b"\xee" * 500)
+    )
+    client.constructor.collect_frames()
+    assert client.messages == [payloads[0], payloads[2], payloads[3] + payloads[4], "a" * 500, b"\xee" * 500]
+    assert client.pings == [payloads[1][:100], payloads[5][:100]]
+    assert_pool_has_no_duplicates()
+
+
+def test_detach_then_release_returns_the_buffer_once():
+    data = frame(True, FrameOpcode.BINARY, b"x" * 100)
+    loaded = Frame.load(io.BufferedReader(io.BytesIO(data)))
+    _BUFFERS.pools[1024].clear()
+    loaded.detach()
+    assert loaded.payload == b"x" * 100
+    loaded.release()
+    assert len(_BUFFERS.pools[1024]) == 1
+    assert_pool_has_no_duplicates()
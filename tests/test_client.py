@@ -0,0 +1,63 @@
+from gevent import sleep, socket, spawn
+
+from zoey import Client, ConnectionStatus, Extension
+from zoey.framing import ControlFrame, Frame, FrameOpcode, Ping
+
+
+class RecordingSocket:
+
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        self.sent.append(bytes(data))
+
+
+class RSV1Extension(Extension):
+    RSV1 = True
+
+    def should_set(self, rsv, frame):
+        return rsv == 0
+
+
+def make_client(*extensions) -> Client:
+    client = Client("ws://example.com/", *extensions)
+    client.socket = RecordingSocket()
+    return client
+
+
+def test_control_frame_rsvs_are_cached():
+    client = make_client(RSV1Extension)
+    client.send_control(Ping, mask=False)
+    client.send_control(Ping, mask=False)
+    assert client._control_rsvs[Ping] == 0b100
+    assert client.socket.sent == [b"\xc9\x00", b"\xc9\x00"]
+
+
+def test_control_frame_with_legacy_build_signature():
+    class Custom(ControlFrame):
+        OPCODE = FrameOpcode.PONG
+
+        @classmethod
+        def build(cls, extensions, mask):
+            return super().build(extensions, mask, b"custom")
+
+    client = make_client(RSV1Extension)
+    client.send_control(Custom, mask=False)
+    assert client.socket.sent == [b"\xca\x06custom"]
+
+
+def test_close_from_another_greenlet_stops_the_collector():
+    client = Client("ws://example.com/")
+    client.socket, server = socket.socketpair()
+    client._rfile = client.socket.makefile("rb")
+    client.status = ConnectionStatus.CONNECTED
+    client._connect_greenlet = spawn(client.constructor.collect_frames)
+    sleep(0)  # Let the collector block on its first read
+
+    # The peer never answers the Close frame, so only close() can end the read
+    client.close()
+    client._connect_greenlet.join(timeout=1)
+    assert client._connect_greenlet.dead
+    assert Frame.load(server.makefile("rb")).opcode is FrameOpcode.CLOSE
+    server.close()
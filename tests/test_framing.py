@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from zoey import framing
+from zoey.framing import Close, Frame, FrameOpcode
+
+
+def reader(data: bytes) -> io.BufferedReader:
+    return io.BufferedReader(io.BytesIO(data))
+
+
+def test_load_16_bit_extended_length():
+    payload = bytes(range(256)) * 2
+    frame = Frame.load(reader(bytes(Frame(True, 0, FrameOpcode.BINARY, payload).build())))
+    assert frame.opcode is FrameOpcode.BINARY
+    assert bytes(frame.payload) == payload
+
+
+def test_load_masked_16_bit_extended_length():
+    payload = b"zoey" * 100
+    data = bytes(Frame(True, 0, FrameOpcode.TEXT, payload, b"\x01\x02\x03\x04").build())
+    frame = Frame.load(reader(data))
+    assert frame.mask == b"\x01\x02\x03\x04"
+    assert bytes(frame.payload) == payload
+
+
+def test_close_code_and_reason():
+    data = bytes(Close.build([], False, code=1001, reason="going away"))
+    close = Close(Frame.load(reader(data)))
+    assert close.code == 1001
+    assert close.reason == "going away"
+
+
+def test_close_code_without_reason():
+    data = bytes(Close.build([], False, code=1000))
+    close = Close(Frame.load(reader(data)))
+    assert close.code == 1000
+    assert close.reason is None
+
+
+@pytest.mark.parametrize("length", [1025, 2001, 65537])
+def test_numpy_masked_round_trip(monkeypatch, length):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(framing, "_apply_mask", None)
+    mask = b"\x12\x34\x56\x78"
+    payload = bytes(i % 251 for i in range(length))
+    data = bytes(Frame(True, 0, FrameOpcode.BINARY, payload, mask).build())
+    # The header before the payload is 8 or 14 bytes, so the masked write starts unaligned
+    assert data.endswith(bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+    frame = Frame.load(reader(data))
+    assert bytes(frame.payload) == payload
+
+
+@pytest.mark.parametrize("length", [31, 32, 33, 64])
+@pytest.mark.parametrize("offset", [0, 3])
+def test_c_apply_mask_matches_python(monkeypatch, length, offset):
+    c_mask = pytest.importorskip("zoey._mask")
+    monkeypatch.setattr(framing, "_apply_mask", None)
+    monkeypatch.setattr(framing, "numpy", None)
+    mask = b"\xa1\xb2\xc3\xd4"
+    content = bytes(range(7, 7 + length))
+
+    expected = Frame.apply_mask(mask, content, bytearray(b"\x00" * (offset + length)), offset)
+    out = bytearray(b"\x00" * (offset + length))
+    c_mask.apply_mask(mask, content, out, offset)
+    assert out == expected
+
+
+def test_c_apply_mask_rejects_bad_mask():
+    c_mask = pytest.importorskip("zoey._mask")
+    with pytest.raises(ValueError):
+        c_mask.apply_mask(b"abc", b"content", bytearray(7), 0)
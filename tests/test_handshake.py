@@ -0,0 +1,26 @@
+import io
+from urllib.parse import urlparse
+
+from zoey.framing import Frame, FrameOpcode
+from zoey.handshake import ServerResponse, WebsocketUpgrade
+
+
+def test_frame_sent_with_the_response_is_kept():
+    upgrade = WebsocketUpgrade(urlparse("ws://example.com/chat"), [])
+    response = (
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Accept: {}\r\n"
+        "\r\n"
+    ).format(upgrade.expecting_key).encode("utf8")
+    welcome = bytes(Frame(True, 0, FrameOpcode.TEXT, b"welcome").build())
+    stream = io.BufferedReader(io.BytesIO(response + welcome))
+
+    loaded = ServerResponse.load(stream)
+    assert loaded.code == 101
+    assert upgrade.confirm(loaded)
+
+    frame = Frame.load(stream)
+    assert frame.opcode is FrameOpcode.TEXT
+    assert bytes(frame.payload) == b"welcome"
@@ -0,0 +1,118 @@
+/* Optional accelerator for zoey.framing.Frame.apply_mask. */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#include <immintrin.h>
+#define ZOEY_HAVE_AVX2 1
+static int use_avx2 = 0;
+#endif
+
+
+/* Unaligned loads/stores keep the mask phase fixed at offset 0, so the
+ * vector loop never needs to rotate the mask word. */
+#ifdef ZOEY_HAVE_AVX2
+__attribute__((target("avx2")))
+static Py_ssize_t
+mask_avx2(const uint8_t *in, uint8_t *out, Py_ssize_t n, uint32_t mask)
+{
+    __m256i m = _mm256_set1_epi32((int)mask);
+    Py_ssize_t i = 0;
+    for (; i + 32 <= n; i += 32) {
+        __m256i chunk = _mm256_loadu_si256((const __m256i *)(in + i));
+        _mm256_storeu_si256((__m256i *)(out + i), _mm256_xor_si256(chunk, m));
+    }
+    return i;
+}
+#endif
+
+
+static void
+mask_words(const uint8_t *in, uint8_t *out, Py_ssize_t start, Py_ssize_t n, const uint8_t *mask)
+{
+    uint32_t m32;
+    uint64_t m64, word;
+    Py_ssize_t i = start;
+
+    memcpy(&m32, mask, 4);
+    m64 = ((uint64_t)m32 << 32) | m32;
+    for (; i + 8 <= n; i += 8) {
+        memcpy(&word, in + i, 8);
+        word ^= m64;
+        memcpy(out + i, &word, 8);
+    }
+    for (; i < n; i++) {
+        out[i] = in[i] ^ mask[i & 3];
+    }
+}
+
+
+static PyObject *
+apply_mask(PyObject *self, PyObject *args)
+{
+    Py_buffer mask, content, out;
+    Py_ssize_t offset, done = 0;
+    uint8_t *target;
+
+    if (!PyArg_ParseTuple(args, "y*y*w*n:apply_mask", &mask, &content, &out, &offset)) {
+        return NULL;
+    }
+    if (mask.len != 4) {
+        PyErr_SetString(PyExc_ValueError, "mask must be exactly 4 bytes");
+        goto error;
+    }
+    if (offset < 0 || offset > out.len || content.len > out.len - offset) {
+        PyErr_SetString(PyExc_ValueError, "output buffer too small");
+        goto error;
+    }
+    target = (uint8_t *)out.buf + offset;
+
+#ifdef ZOEY_HAVE_AVX2
+    if (use_avx2) {
+        uint32_t m32;
+        memcpy(&m32, mask.buf, 4);
+        done = mask_avx2((const uint8_t *)content.buf, target, content.len, m32);
+    }
+#endif
+    mask_words((const uint8_t *)content.buf, target, done, content.len, (const uint8_t *)mask.buf);
+
+    PyBuffer_Release(&mask);
+    PyBuffer_Release(&content);
+    PyBuffer_Release(&out);
+    Py_RETURN_NONE;
+
+error:
+    PyBuffer_Release(&mask);
+    PyBuffer_Release(&content);
+    PyBuffer_Release(&out);
+    return NULL;
+}
+
+
+static PyMethodDef mask_methods[] = {
+    {"apply_mask", apply_mask, METH_VARARGS, "XOR content with a repeating 4 byte websocket mask into out at offset."},
+    {NULL, NULL, 0, NULL}
+};
+
+
+static struct PyModuleDef mask_module = {
+    PyModuleDef_HEAD_INIT,
+    "zoey._mask",
+    NULL,
+    -1,
+    mask_methods
+};
+
+
+PyMODINIT_FUNC
+PyInit__mask(void)
+{
+#ifdef ZOEY_HAVE_AVX2
+    __builtin_cpu_init();
+    use_avx2 = __builtin_cpu_supports("avx2");
+#endif
+    return PyModule_Create(&mask_module);
+}
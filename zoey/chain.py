@@ -1,12 +1,8 @@
-from collections import ChainMap
 from struct import error
 from typing import List, Tuple, Type, Optional, Union
 
 from zoey.exceptions import InvalidExtension
 from zoey.framing import Close, ControlFrame, Frame, FrameOpcode, Message, Ping, Pong
-from zoey.utils import ConnectionStatus
-
-from gevent import spawn, sleep
 
 
 class Extension:
@@ -71,25 +67,34 @@ class WSConstructor:
             if frame.opcode == FrameOpcode.CONTINUATION:
                 return False, "Sent continuation without initial frame."
 
-        if frame.opcode not in FrameOpcode:
+        if frame.opcode is FrameOpcode.RESERVED:
             return False, "Unknown opcode used."
-        used_rsv = ChainMap(*[{"R1": r.RSV1, "R2": r.RSV2, "R3": r.RSV3} for r in self.client.extensions])
-        if not used_rsv.get("R1") and frame.rsvs.rsv1:
+        unexpected = frame.rsvs & ~self.client._rsv_allowed
+        if unexpected & 0b100:
             return False, "Used frame-rsv1 without proper extension"
-        if not used_rsv.get("R2") and frame.rsvs.rsv2:
+        if unexpected & 0b010:
             return False, "Used frame-rsv2 without proper extension"
-        if not used_rsv.get("R3") and frame.rsvs.rsv3:
+        if unexpected & 0b001:
             return False, "Used frame-rsv3 without proper extension"
         return True, None
 
     def recv_frame(self, frame: Frame):
         good_frame, reason = self.verify(frame)
         if not good_frame:
+            frame.release()
             return self.client.close(1002, reason)
-        if frame.opcode in (FrameOpcode.TEXT, FrameOpcode.BINARY):
+        # Fragments are appended in order, so a pending previous frame can only be the newest one
+        previous_pending = bool(self.frame_setup) and self.frame_setup[-1] is self.last_frame
+        if frame.opcode in (FrameOpcode.TEXT, FrameOpcode.BINARY, FrameOpcode.CONTINUATION):
+            if not frame.final:
+                frame.detach()  # Pending fragments mustn't each pin a whole pooled buffer
             self.frame_setup.append(frame)
             if frame.final:
                 msg = Message(self.frame_setup)
+                for fragment in self.frame_setup[:-1]:
+                    if fragment is not self.last_frame:
+                        fragment.release()
+                self.frame_setup = []
                 self.client.trigger("on_message", msg)
                 self.client.on_message(msg)
         elif frame.opcode == FrameOpcode.PING:
@@ -104,18 +109,15 @@ class WSConstructor:
             close = Close(frame)
             self.client.trigger("on_close", close)
             self.client.on_close(close)
+        # Only the previous frame is kept for verify; recycle it unless it's still a pending fragment
+        if self.last_frame is not None and not (previous_pending and self.frame_setup):
+            self.last_frame.release()
         self.last_frame = frame
 
     def collect_frames(self):
-        while True:
+        while not self.client._closed.is_set():
             try:
-                frame = Frame.load(self.client.socket)
-            except error:
+                frame = Frame.load(self.client._rfile)
+            except (error, EOFError):
                 break
             self.recv_frame(frame)
-
-    def start(self):
-        greenlet = spawn(self.collect_frames)
-        while self.client.status == ConnectionStatus.CONNECTED:
-            sleep(0.05)
-        greenlet.kill()
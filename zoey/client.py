@@ -1,3 +1,4 @@
+from inspect import signature
 from urllib.parse import urlparse
 from typing import Union, Type
 from os import urandom
@@ -8,8 +9,9 @@ from zoey.framing import ControlFrame, Close, ExtensionRsvs, Message, Ping, Pong
 from zoey.handshake import WebsocketUpgrade, ServerResponse
 from zoey.utils import ConnectionStatus
 
-from gevent import spawn
-import gevent._ssl3 as ssl
+from gevent import getcurrent, spawn
+from gevent.event import Event
+import gevent.ssl as ssl
 import gevent._socket3 as socket
 
 
@@ -17,6 +19,7 @@ class Client:
 
     WS_PORT = 80, 443
     MAX_SIZE = (2 ** 64) - 1
+    READ_BUFFER = 65536
 
     def __init__(self, ws_uri: str, *extensions: Type[Extension], origin: str=None,
                  host: str=None, context: ssl.SSLContext=None):
@@ -26,49 +29,70 @@ class Client:
             raise NotImplementedError("Scheme must be either 'wss' or 'ws'.")
 
         self.extensions = [extension(self) for extension in extensions]
+        self._rsv_allowed = ExtensionRsvs(
+            any(e.RSV1 for e in self.extensions),
+            any(e.RSV2 for e in self.extensions),
+            any(e.RSV3 for e in self.extensions)
+        )
+        self._frame_rsvs = self._should_set(Frame)
+        self._control_rsvs = {}
         self.overwrites = {"origin": origin, "host": host}
         self.status = ConnectionStatus.CLOSED
         self.socket = socket.socket()
+        # Every frame goes out in a single write, so Nagle would only add latency
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.constructor = WSConstructor(self)
         if self.is_secure:
-            context = context or ssl.create_default_context()
+            if context is None:
+                # gevent.ssl.create_default_context hands back a blocking stdlib context
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                context.load_default_certs()
             self.socket = context.wrap_socket(self.socket, server_hostname=host or self.uri.hostname)
 
         self.close_reason = None
+        self._rfile = None
+        self._closed = Event()
         self._connect_greenlet = None
 
     def trigger(self, name: str, *args, **kwargs):
         for extension in self.extensions:
             getattr(extension, name)(*args, **kwargs)
 
+    def _should_set(self, frame: Type[Union[ControlFrame, Frame]]) -> int:
+        return ExtensionRsvs(*(int(any(e.should_set(i, frame) for e in self.extensions)) for i in range(3)))
+
     def send_control(self, frame: Type[ControlFrame], **kwargs):
         self.trigger("before_control_frame", frame)
+        if frame not in self._control_rsvs:
+            # Subclasses may still override build(extensions, mask) and work their flags out themselves
+            accepts_rsvs = "rsvs" in signature(frame.build).parameters
+            self._control_rsvs[frame] = self._should_set(frame) if accepts_rsvs else None
+        rsvs = self._control_rsvs[frame]
+        if rsvs is not None:
+            kwargs["rsvs"] = rsvs
         data = frame.build(**kwargs, extensions=self.extensions)
-        self.socket.send(data)
+        self.socket.sendall(data)
 
     def send_message(self, msg: Union[bytes, str]):
         is_text = isinstance(msg, str)
         if is_text:
             msg = msg.encode("utf8")
+        # Slicing a memoryview doesn't copy; Frame.build reads straight from it
+        view = memoryview(msg)
         msgs = []
-        for chunk in range(0, len(msg), self.MAX_SIZE):
-            msgs.append(msg[chunk: chunk + self.MAX_SIZE])
-
-        rsvs = [False, False, False]
-        for extension in self.extensions:
-            for i in range(3):
-                rsvs[i] = extension.should_set(i, Frame)
+        for chunk in range(0, len(view), self.MAX_SIZE):
+            msgs.append(view[chunk: chunk + self.MAX_SIZE])
 
         for i, part in enumerate(msgs):
             frame = Frame(
                 True if i == len(msgs) - 1 else False,
-                ExtensionRsvs(*map(int, rsvs)),
+                self._frame_rsvs,
                 FrameOpcode.TEXT if is_text else FrameOpcode.BINARY,
                 part,
                 urandom(4) if not self.is_secure else None
             )
             self.trigger("before_frame", frame)
-            self.socket.send(frame.build())
+            self.socket.sendall(frame.build())
 
     @property
     def is_secure(self) -> bool:
@@ -78,20 +102,33 @@ class Client:
         if ConnectionStatus.CONNECTED:
             self.send_control(Close, mask=urandom(4) if not self.is_secure else None, code=code, reason=reason)
             self.status = ConnectionStatus.CLOSING
+            self._closed.set()
+            self._stop_reading()
         elif ConnectionStatus.CONNECTING:
             self.socket.close()
+            self._closed.set()
         elif ConnectionStatus.CLOSING:
             self.socket.close()
+            self._closed.set()
         else:
             raise AlreadyClosed
 
+    def _stop_reading(self):
+        # The collector only checks _closed between frames, so it has to be woken out of a blocking read
+        if self._connect_greenlet is not None and self._connect_greenlet is not getcurrent():
+            self._connect_greenlet.kill()
+        if self._rfile is not None:
+            self._rfile.close()
+        self.socket.close()
+
     def connect(self):
         self.status = ConnectionStatus.CONNECTING
         self.socket.connect((self.uri.hostname, self.WS_PORT[1] if self.is_secure else self.WS_PORT[0]))
+        self._rfile = self.socket.makefile("rb", buffering=self.READ_BUFFER)
         upgrade = WebsocketUpgrade(self.uri, self.extensions, **self.overwrites)
         data = upgrade.build()
-        self.socket.send(data)
-        response = ServerResponse.load(self.socket)
+        self.socket.sendall(data)
+        response = ServerResponse.load(self._rfile)
         if response.code != 101:
             self.close()
             raise HandshakeFail("Code: {}".format(response.code))
@@ -99,7 +136,7 @@ class Client:
             self.close()
             raise HandshakeFail("Invalid websocket response")
         self.status = ConnectionStatus.CONNECTED
-        self._connect_greenlet = spawn(self.constructor.start)
+        self._connect_greenlet = spawn(self.constructor.collect_frames)
         self.trigger("on_connection")
         self.on_connection()
 
@@ -1,17 +1,58 @@
-from collections import namedtuple
+from codecs import getincrementaldecoder
+from collections import deque
 from enum import Enum
-from typing import BinaryIO, List
-from struct import pack, unpack, calcsize
+from typing import BinaryIO, List, Union
+from struct import Struct
 import os
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-ExtensionRsvs = namedtuple("ExtensionRsvs", "rsv1 rsv2 rsv3")
+try:
+    from zoey._mask import apply_mask as _apply_mask
+except ImportError:
+    _apply_mask = None
 
 
-def unpack_from(fmt: str, stream: BinaryIO):
-    size = calcsize(fmt)
-    data = stream.read(size)
-    return unpack(fmt, data)
+class BufferPool:
+
+    def __init__(self):
+        # Bucket size -> recycled buffers of exactly that size
+        self.pools = {1024: deque(maxlen=32), 16384: deque(maxlen=16), 262144: deque(maxlen=8)}
+
+    def get(self, length: int) -> bytearray:
+        for size, pool in self.pools.items():
+            if size >= length:
+                return pool.pop() if pool else bytearray(size)
+        return bytearray(length)
+
+    def put(self, buffer: bytearray):
+        pool = self.pools.get(len(buffer))
+        if pool is not None:
+            pool.append(buffer)
+
+
+# Recycled Frame instances and payload buffers for the receive path, see Frame.load and Frame.release
+_FREELIST = deque(maxlen=64)
+_BUFFERS = BufferPool()
+
+
+def ExtensionRsvs(rsv1: int, rsv2: int, rsv3: int) -> int:
+    # Packed in wire order, so the result shifts straight into the frame header
+    return (rsv1 & 1) << 2 | (rsv2 & 1) << 1 | (rsv3 & 1)
+
+
+_HEADER = Struct("!BB")
+_HEADER_16 = Struct("!BBH")
+_HEADER_64 = Struct("!BBQ")
+_LENGTH_16 = Struct("!H")
+_LENGTH_64 = Struct("!Q")
+_CLOSE_CODE = Struct("!H")
+
+# Below this size NumPy's per-call overhead loses to the big-int XOR in apply_mask
+_NUMPY_MIN_LENGTH = 1024
 
 
 class FrameOpcode(Enum):
@@ -25,102 +66,155 @@ class FrameOpcode(Enum):
 
     @classmethod
     def from_value(cls, value: int):
-        for enum in cls:
-            if enum.value == value:
-                return enum
+        return cls._value2member_map_.get(value, cls.RESERVED)
 
 
 class Frame:
 
-    def __init__(self, final: bool, rsvs: ExtensionRsvs, opcode: FrameOpcode, payload: bytes, mask: bytes=None):
+    __slots__ = ("final", "rsvs", "opcode", "payload", "mask", "_buffer")
+
+    def __init__(self, final: bool, rsvs: int, opcode: FrameOpcode, payload: Union[bytes, memoryview],
+                 mask: bytes=None):
         self.final = final
         self.rsvs = rsvs
         self.opcode = opcode
         self.payload = payload
         self.mask = mask
+        self._buffer = None
 
-    def build(self) -> bytes:
-        frame = bytes()
-        frame += pack("!B", int(self.final) << 7 |
-                      self.rsvs[0] << 6 |
-                      self.rsvs[1] << 5 |
-                      self.rsvs[2] << 4 |
-                      self.opcode.value
-                      )
+    def build(self) -> bytearray:
+        code_header = int(self.final) << 7 | self.rsvs << 4 | self.opcode.value
+        mask_bit = 0 if self.mask is None else 128
         payload_length = len(self.payload)
         if payload_length <= 125:
-            frame += pack("!B", payload_length | (0 if self.mask is None else 128))
+            header, fields = _HEADER, (code_header, payload_length | mask_bit)
         elif payload_length <= 0xFFFF:
-            frame += pack("!B", 126 | (0 if self.mask is None else 128))
-            frame += pack("!H", payload_length)
+            header, fields = _HEADER_16, (code_header, 126 | mask_bit, payload_length)
         else:
-            frame += pack("!B", 127 | (0 if self.mask is None else 128))
-            frame += pack("!Q", payload_length)
+            header, fields = _HEADER_64, (code_header, 127 | mask_bit, payload_length)
+        header_length = header.size + (0 if self.mask is None else 4)
+        frame = bytearray(header_length + payload_length)
+        header.pack_into(frame, 0, *fields)
         if self.mask is not None:
-            frame += self.mask
-            frame += self.apply_mask(self.mask, self.payload)
+            frame[header_length - 4:header_length] = self.mask
+            self.apply_mask(self.mask, self.payload, frame, header_length)
         else:
-            frame += self.payload
+            frame[header_length:] = self.payload
         return frame
 
     @classmethod
     def load(cls, stream: BinaryIO):
-        code_header = unpack_from("!B", stream)[0]
+        code_header, mask_length = _HEADER.unpack(stream.read(2))
         final = bool(code_header & 128)
-        rsvs_raw = code_header & 64, code_header & 32, code_header & 16
-        rsvs = ExtensionRsvs(*(1 if r else 0 for r in rsvs_raw))
-        opcode = FrameOpcode.from_value(code_header & 0xF)
-        mask_length = unpack_from("!B", stream)[0]
+        rsvs = (code_header >> 4) & 0x7
+        opcode = FrameOpcode._value2member_map_.get(code_header & 0xF, FrameOpcode.RESERVED)
         has_mask = mask_length & 0x80
         payload_length = mask_length & ~0x80
+
+        # Extended length and mask key are read together in one call
+        extra = (2 if payload_length == 126 else 8 if payload_length == 127 else 0) + (4 if has_mask else 0)
+        header = stream.read(extra) if extra else b""
         if payload_length == 126:
-            payload_length = unpack_from("!B", stream)[0]
+            payload_length = _LENGTH_16.unpack_from(header)[0]
         elif payload_length == 127:
-            payload_length = unpack_from("!Q", stream)[0]
-        if has_mask:
-            mask = stream.read(4)
-            payload = cls.apply_mask(mask, stream.read(payload_length))
-            return cls(final, rsvs, opcode, payload, mask)
+            payload_length = _LENGTH_64.unpack_from(header)[0]
+        mask = header[-4:] if has_mask else None
+
+        if payload_length:
+            buffer = _BUFFERS.get(payload_length)
+            payload = memoryview(buffer)[:payload_length]
+            if stream.readinto(payload) != payload_length:
+                raise EOFError("Connection closed mid-frame")
+            if has_mask:
+                cls.apply_mask(mask, payload, buffer)
         else:
-            payload = stream.read(payload_length)
-            return cls(final, rsvs, opcode, payload)
+            buffer, payload = None, b""
+
+        frame = _FREELIST.pop() if cls is Frame and _FREELIST else cls.__new__(cls)
+        frame.final = final
+        frame.rsvs = rsvs
+        frame.opcode = opcode
+        frame.payload = payload
+        frame.mask = mask
+        frame._buffer = buffer
+        return frame
+
+    def detach(self):
+        # Copies the payload out of its pooled buffer so the frame can be held on to
+        if self._buffer is not None:
+            self.payload = bytes(self.payload)
+            _BUFFERS.put(self._buffer)
+            self._buffer = None
+
+    def release(self):
+        # Hands the instance and its payload buffer back to Frame.load; neither may be used afterwards
+        self.payload = self.mask = None
+        if self._buffer is not None:
+            _BUFFERS.put(self._buffer)
+            self._buffer = None
+        if type(self) is Frame:
+            _FREELIST.append(self)
 
     @staticmethod
-    def apply_mask(mask: bytes, content: bytes) -> bytearray:
-        content_array = bytearray(content)
-        for i, chunk in enumerate(content_array):
-            content_array[i] = chunk ^ (mask[i % 4])
-        return content_array
+    def apply_mask(mask: bytes, content: bytes, out: bytearray=None, offset: int=0) -> bytearray:
+        length = len(content)
+        if out is None:
+            out, offset = bytearray(length), 0
+        if _apply_mask is not None:
+            _apply_mask(mask, content, out, offset)
+            return out
+        if numpy is not None and length >= _NUMPY_MIN_LENGTH:
+            # XOR whole 32-bit words at once, then finish the unaligned tail by hand
+            aligned = length & ~3
+            mask_word = numpy.frombuffer(mask, dtype="<u4")[0]
+            target = numpy.frombuffer(out, dtype="<u4", count=aligned // 4, offset=offset)
+            words = numpy.frombuffer(content, dtype="<u4", count=aligned // 4)
+            numpy.bitwise_xor(words, mask_word, out=target)
+            for i in range(aligned, length):
+                out[offset + i] = content[i] ^ mask[i & 3]
+            return out
+        # A single big-int XOR runs word-at-a-time in C instead of per byte in Python
+        tiled = (mask * ((length + 3) // 4))[:length]
+        masked = int.from_bytes(content, "big") ^ int.from_bytes(tiled, "big")
+        out[offset:offset + length] = masked.to_bytes(length, "big")
+        return out
 
 
 class Message:
 
+    __slots__ = ("data_type", "data")
+
     def __init__(self, chain: List[Frame]):
         self.data_type = str if chain[0].opcode == FrameOpcode.TEXT else bytes
-        self.data = b"".join(c.payload for c in chain)
-        if not isinstance(self.data, self.data_type):
-            self.data = self.data.decode('utf-8')
+        if len(chain) == 1:
+            payload = chain[0].payload
+            self.data = str(payload, 'utf-8') if self.data_type is str else bytes(payload)
+        elif self.data_type is str:
+            # Decode fragment by fragment rather than joining every payload into one bytes object first
+            decoder = getincrementaldecoder('utf-8')()
+            self.data = "".join([decoder.decode(c.payload) for c in chain]) + decoder.decode(b"", final=True)
+        else:
+            self.data = b"".join(c.payload for c in chain)
 
 
 class ControlFrame:
 
+    __slots__ = ("type", "raw_data")
+
     OPCODE = FrameOpcode.RESERVED
 
     def __init__(self, frame: Frame):
         self.type = frame.opcode
-        self.raw_data = frame.payload
+        self.raw_data = bytes(frame.payload)  # The frame's buffer is recycled once it's released
         self.load()  # Makes subclassing easy
 
     def load(self):
         pass
 
     @classmethod
-    def build(cls, extensions: List, mask: bool, payload: bytes=None):
-        rsvs = [False, False, False]
-        for i in range(3):
-            for extension in extensions:
-                rsvs[i] = extension.should_set(i, cls)
-        rsvs = ExtensionRsvs(*map(int, rsvs))
+    def build(cls, extensions: List, mask: bool, payload: bytes=None, rsvs: int=None):
+        if rsvs is None:
+            rsvs = ExtensionRsvs(*(int(any(e.should_set(i, cls) for e in extensions)) for i in range(3)))
 
         return Frame(
             True,
@@ -133,24 +227,30 @@ class ControlFrame:
 
 class Ping(ControlFrame):
 
+    __slots__ = ()
+
     OPCODE = FrameOpcode.PING
 
     @classmethod
-    def build(cls, extensions: List, mask: bool):
-        return super().build(extensions, mask, None)
+    def build(cls, extensions: List, mask: bool, rsvs: int=None):
+        return super().build(extensions, mask, None, rsvs)
 
 
 class Pong(ControlFrame):
 
+    __slots__ = ()
+
     OPCODE = FrameOpcode.PONG
 
     @classmethod
-    def build(cls, extensions: List, mask: bool):
-        return super().build(extensions, mask, None)
+    def build(cls, extensions: List, mask: bool, rsvs: int=None):
+        return super().build(extensions, mask, None, rsvs)
 
 
 class Close(ControlFrame):
 
+    __slots__ = ("code", "reason")
+
     OPCODE = FrameOpcode.CLOSE
 
     def __init__(self, frame: Frame):
@@ -159,16 +259,16 @@ class Close(ControlFrame):
         super().__init__(frame)
 
     def load(self):
+        if len(self.raw_data) >= 2:
+            self.code = _CLOSE_CODE.unpack_from(self.raw_data)[0]
         if len(self.raw_data) > 2:
-            self.code, self.reason = unpack("!H", self.raw_data[:2]), self.raw_data[:2].decode("utf8")
-        elif len(self.raw_data) == 2:
-            self.code = unpack("!H", self.raw_data)
+            self.reason = self.raw_data[2:].decode("utf8")
 
     @classmethod
-    def build(cls, extensions: List, mask: bool, code: int=None, reason: str=None):
+    def build(cls, extensions: List, mask: bool, code: int=None, reason: str=None, rsvs: int=None):
         payload = b""
         if code:
-            payload += pack("!H", code)
+            payload += _CLOSE_CODE.pack(code)
             if reason:
                 payload += reason.encode("utf8")
-        return super().build(extensions, mask, payload)
+        return super().build(extensions, mask, payload, rsvs)
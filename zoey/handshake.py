@@ -1,27 +1,27 @@
 from base64 import b64encode
 from hashlib import sha1
-from typing import List, Dict
+from http.client import HTTPMessage, parse_headers
+from typing import BinaryIO, List
 from urllib.parse import ParseResult
 import os
 
 from zoey.chain import Extension
-
-
-from http_parser.http import HttpStream, HTTP_RESPONSE
-from http_parser.reader import SocketReader
+from zoey.exceptions import HandshakeFail
 
 
 class ServerResponse:
 
-    def __init__(self, code: int, headers: Dict[str, str]):
+    def __init__(self, code: int, headers: HTTPMessage):
         self.code = code
         self.headers = headers
 
     @classmethod
-    def load(cls, socket):
-        stream = SocketReader(socket)
-        http = HttpStream(stream, kind=HTTP_RESPONSE)
-        return cls(http.status_code(), http.headers())
+    def load(cls, stream: BinaryIO):
+        # Reads line by line so frames sent right after the response stay buffered in the stream
+        status_line = stream.readline(65537).split(None, 2)
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise HandshakeFail("Malformed status line")
+        return cls(int(status_line[1]), parse_headers(stream))
 
 
 class WebsocketUpgrade:
@@ -34,6 +34,7 @@ class WebsocketUpgrade:
         self.path = wss_uri.path.rstrip("/") or '/'
         self.protocol = "HTTP/1.1"
         self.key = b64encode(os.urandom(16)).decode()
+        self.expecting_key = b64encode(sha1(self.key.encode() + self.WS_GUID).digest()).decode()
         self.secure = wss_uri.scheme.endswith("ss")
         self.headers = {
             "Host": host or wss_uri.hostname,
@@ -48,22 +49,17 @@ class WebsocketUpgrade:
             self.headers["Sec-WebSocket-Extensions"] = ", ".\
                 join(extension.NAME for extension in extensions if extension.NEGOTIATE)
 
-    @property
-    def expecting_key(self) -> str:
-        sha1_hash = sha1()
-        sha1_hash.update(self.key.encode() + self.WS_GUID)
-        return b64encode(sha1_hash.digest()).decode()
-
     def build(self):
-        msg = " ".join([self.method, self.path, self.protocol]).encode("utf8") + b"\r\n"
-        msg += "\r\n".join(name + ": " + value for name, value in self.headers.items()).encode("utf8") + b"\r\n\r\n"
-        return msg
+        lines = [" ".join([self.method, self.path, self.protocol])]
+        lines.extend(name + ": " + value for name, value in self.headers.items())
+        lines.append("\r\n")
+        return "\r\n".join(lines).encode("utf8")
 
     def confirm(self, response: ServerResponse):
         try:
             assert response.headers["Upgrade"].lower() == "websocket"
             assert response.headers["Connection"].title() == "Upgrade"
             assert response.headers["Sec-Websocket-Accept"] == self.expecting_key
-        except (AssertionError, KeyError):
+        except (AssertionError, AttributeError):
             return False
         return True